@@ -0,0 +1,252 @@
+# db.py — Supabase: cliente, Auth y capa de datos
+
+import os
+import hashlib
+from datetime import datetime, date
+
+import pandas as pd
+import streamlit as st
+from supabase import create_client, Client
+from supabase.lib.client_options import SyncClientOptions
+
+from utils import normalize_client, to_db_ts
+
+# ==============================
+# Supabase: cliente y Auth
+# ==============================
+def new_client() -> Client:
+    """Cliente nuevo, sin cachear. Úsalo para el flujo de login (OTP), que guarda estado en el cliente."""
+    url = os.environ.get("SUPABASE_URL") or st.secrets["SUPABASE_URL"]
+    key = os.environ.get("SUPABASE_ANON_KEY") or st.secrets["SUPABASE_ANON_KEY"]
+    # El token vive en st.session_state: no persistir la sesión ni lanzar el
+    # temporizador de refresco, que sobraría en un cliente cacheado por proceso
+    opts = SyncClientOptions(persist_session=False, auto_refresh_token=False)
+    return create_client(url, key, options=opts)
+
+@st.cache_resource(show_spinner=False)
+def supa() -> Client:
+    """Cliente anónimo compartido: se crea una sola vez por proceso."""
+    return new_client()
+
+@st.cache_resource(ttl=3600, max_entries=64, show_spinner=False)
+def _authed_client(access_token: str) -> Client:
+    """Cliente con el JWT ya adjunto, uno por access_token."""
+    c = new_client()
+    c.postgrest.auth(access_token)
+    return c
+
+def supa_authd() -> Client:
+    sess = st.session_state.get("sb_session")
+    if sess:
+        return _authed_client(sess["access_token"])
+    return supa()
+
+def logged_in() -> bool:
+    return st.session_state.get("sb_session") is not None
+
+def access_token() -> str | None:
+    sess = st.session_state.get("sb_session")
+    return sess.get("access_token") if sess else None
+
+def token_key() -> str:
+    """Huella corta del access_token, para separar las cachés de cada sesión."""
+    return hashlib.blake2b((access_token() or "").encode(), digest_size=8).hexdigest()
+
+def current_user_email(token: str | None) -> str | None:
+    """Obtiene el email del usuario autenticado a partir de su access_token."""
+    if not token:
+        return None
+    try:
+        return _fetch_user_email(token)
+    except:
+        return None
+
+def is_current_admin(token: str | None) -> bool | None:
+    """True si el usuario del token está en admin_emails; None si no se pudo comprobar."""
+    if not token:
+        return False
+    try:
+        return _fetch_is_admin(token)
+    except:
+        return None
+
+# Los errores se propagan desde aquí: st.cache_data no guarda excepciones, así
+# un fallo de red no deja memorizado un "sin email" o "no es admin"
+@st.cache_data(ttl=300, show_spinner=False)
+def _fetch_user_email(token: str) -> str | None:
+    u = supa().auth.get_user(token)
+    return (u.user.email if u and u.user else None)
+
+@st.cache_data(ttl=300, show_spinner=False)
+def _fetch_is_admin(token: str) -> bool:
+    em = _fetch_user_email(token)
+    if not em:
+        return False
+    resp = (_authed_client(token).table("admin_emails")
+            .select("email").eq("email", em).execute())
+    return bool(resp.data)
+
+def clear_user_cache():
+    _fetch_user_email.clear()
+    _fetch_is_admin.clear()
+
+# ==============================
+# Capa de datos (todas con supa_authd)
+# ==============================
+def add_session(client: str, ts: datetime, amount: int) -> pd.DataFrame:
+    return add_sessions_bulk([{"client": client, "ts": ts, "amount": amount}])
+
+def add_sessions_bulk(rows: list[dict]) -> pd.DataFrame:
+    """Inserta varias clases ({client, ts, amount}) en una sola petición.
+    Devuelve las filas creadas (con su id) en el formato de fetch_sessions_between."""
+    if not rows:
+        return _sessions_frame([])
+    payload = [{
+        "client": normalize_client(r["client"]),
+        "ts": to_db_ts(r["ts"]),
+        "amount": int(round(r["amount"]))  # pesos enteros
+    } for r in rows]
+    res = supa_authd().table("sessions").insert(payload).execute()
+    _clear_sessions_cache()
+    return _sessions_frame(res.data)
+
+def delete_session(row_id: int):
+    supa_authd().table("sessions").delete().eq("id", row_id).execute()
+    _clear_sessions_cache()
+
+def _clear_sessions_cache():
+    _fetch_sessions_between.clear()
+    _fetch_distinct_clients.clear()
+    _sessions_agg_by_client_month.clear()
+    _fetch_month_summary.clear()
+    _fetch_client_month_total.clear()
+
+def _clear_payments_cache():
+    _get_monthly_payment.clear()
+    _fetch_month_summary.clear()
+    _fetch_client_payments.clear()
+
+def fetch_sessions_between(start_dt: datetime, end_dt: datetime) -> pd.DataFrame:
+    return _fetch_sessions_between(start_dt, end_dt, token_key())
+
+@st.cache_data(ttl=60, show_spinner=False)
+def _fetch_sessions_between(start_dt: datetime, end_dt: datetime, token_fp: str) -> pd.DataFrame:
+    # token_fp solo forma parte de la clave de caché; la consulta usa supa_authd()
+    res = (supa_authd().table("sessions")
+           .select("id, client, ts, amount")
+           .gte("ts", to_db_ts(start_dt))
+           .lt("ts", to_db_ts(end_dt))
+           .order("ts", desc=False)
+           .execute())
+    return _sessions_frame(res.data)
+
+def _sessions_frame(rows: list[dict]) -> pd.DataFrame:
+    df = pd.DataFrame(rows)
+    if df.empty:
+        return df
+    df["client"] = df["client"].astype("category")
+    df["ts"] = pd.to_datetime(df["ts"], format="ISO8601", utc=True)
+    df["fecha"] = df["ts"].dt.strftime("%Y-%m-%d")
+    df["hora"] = df["ts"].dt.strftime("%H:%M")
+    return df[["id","client","fecha","hora","amount","ts"]]
+
+def fetch_distinct_clients() -> list:
+    return _fetch_distinct_clients(token_key())
+
+@st.cache_data(ttl=120, show_spinner=False)
+def _fetch_distinct_clients(token_fp: str) -> list:
+    res = supa_authd().rpc("distinct_clients").execute()
+    return [r["client"] for r in (res.data or []) if r.get("client")]
+
+def fetch_client_month_total(client: str, year: int, month: int) -> float:
+    """Monto total de un cliente en un mes, leído de monthly_totals (una fila)."""
+    return _fetch_client_month_total(normalize_client(client), int(year), int(month), token_key())
+
+@st.cache_data(ttl=300, show_spinner=False)
+def _fetch_client_month_total(client: str, year: int, month: int, token_fp: str) -> float:
+    res = (supa_authd().table("monthly_totals")
+           .select("monto")
+           .eq("client", client).eq("year", year).eq("month", month)
+           .execute())
+    return float(res.data[0]["monto"]) if res.data else 0.0
+
+def get_monthly_payment(client: str, year: int, month: int) -> dict:
+    return _get_monthly_payment(normalize_client(client), int(year), int(month), token_key())
+
+@st.cache_data(ttl=300, show_spinner=False)
+def _get_monthly_payment(client: str, year: int, month: int, token_fp: str) -> dict:
+    res = (supa_authd().table("monthly_payments")
+           .select("paid, paid_on")
+           .eq("client", client).eq("year", year).eq("month", month)
+           .execute())
+    if not res.data:
+        return {"paid": 0, "paid_on": None}
+    row = res.data[0]
+    return {"paid": 1 if row.get("paid") else 0, "paid_on": row.get("paid_on")}
+
+def fetch_month_summary(year: int, month: int) -> pd.DataFrame:
+    """Clases, monto y estado de pago por cliente en un mes (vista monthly_summary)."""
+    return _fetch_month_summary(int(year), int(month), token_key())
+
+@st.cache_data(ttl=300, show_spinner=False)
+def _fetch_month_summary(year: int, month: int, token_fp: str) -> pd.DataFrame:
+    res = (supa_authd().table("monthly_summary")
+           .select("client, clases, monto, paid")
+           .eq("year", year).eq("month", month)
+           .order("client")
+           .execute())
+    df = pd.DataFrame(res.data, columns=["client", "clases", "monto", "paid"])
+    return df.rename(columns={"client":"Cliente", "clases":"Clases", "monto":"Monto"})
+
+def set_monthly_payment(client: str, year: int, month: int, paid: bool, paid_on: date | None):
+    client = normalize_client(client)
+    payload = {
+        "client": client,
+        "year": int(year),
+        "month": int(month),
+        "paid": bool(paid),
+        "paid_on": paid_on.isoformat() if (paid and paid_on) else None
+    }
+    supa_authd().table("monthly_payments").upsert(payload, on_conflict="client,year,month").execute()
+    _clear_payments_cache()
+
+def sessions_agg_by_client_month(client: str | None = None) -> pd.DataFrame:
+    """Clases y monto por cliente/mes, precalculados en Postgres (tabla monthly_totals)."""
+    return _sessions_agg_by_client_month(client, token_key())
+
+@st.cache_data(ttl=300, show_spinner=False)
+def _sessions_agg_by_client_month(client: str | None, token_fp: str) -> pd.DataFrame:
+    q = supa_authd().table("monthly_totals").select("client, year, month, clases, monto")
+    if client:
+        q = q.eq("client", normalize_client(client))
+    res = q.order("client").order("year").order("month").execute()
+    df = pd.DataFrame(res.data)
+    if df.empty:
+        return pd.DataFrame(columns=["Cliente","Año","Mes","Clases","Monto"])
+    return df.rename(columns={"client":"Cliente", "year":"Año", "month":"Mes",
+                              "clases":"Clases", "monto":"Monto"})
+
+def join_with_payments(agg_df: pd.DataFrame, client: str) -> pd.DataFrame:
+    if agg_df.empty:
+        return agg_df
+    years = sorted(int(y) for y in agg_df["Año"].unique())
+    pays = _fetch_client_payments(normalize_client(client), years, token_key())
+    if pays.empty:
+        agg_df["Estado mes"] = "Pendiente"
+        agg_df["Fecha pago mes"] = "—"
+        return agg_df
+    # La consulta ya viene filtrada por cliente: basta alinear por (Año, Mes)
+    pays = pays.rename(columns={"year":"Año","month":"Mes"}).set_index(["Año","Mes"])
+    merged = agg_df.join(pays[["paid","paid_on"]], on=["Año","Mes"], how="left")
+    merged["paid"] = merged["paid"].fillna(0).astype(int)
+    merged["Estado mes"] = merged["paid"].map({0:"Pendiente", 1:"Pagado"})
+    merged["Fecha pago mes"] = merged["paid_on"].fillna("—")
+    return merged.drop(columns=["paid","paid_on"])
+
+@st.cache_data(ttl=300, show_spinner=False)
+def _fetch_client_payments(client: str, years: list[int], token_fp: str) -> pd.DataFrame:
+    res = (supa_authd().table("monthly_payments")
+           .select("year, month, paid, paid_on")
+           .eq("client", client).in_("year", years)
+           .execute())
+    return pd.DataFrame(res.data)
@@ -0,0 +1,17 @@
+-- Agregado de clases por cliente y mes, calculado en Postgres.
+-- Ejecutar una vez en el SQL editor de Supabase.
+
+-- security_invoker: la vista respeta las políticas RLS de "sessions"
+create or replace view sessions_agg
+with (security_invoker = true) as
+select
+    client,
+    extract(year from ts)::int  as year,
+    extract(month from ts)::int as month,
+    count(*)                    as clases,
+    sum(amount)                 as monto
+from sessions
+group by 1, 2, 3;
+
+-- Sirve el filtro por cliente del historial
+create index if not exists sessions_client_ts_idx on sessions (client, ts);
@@ -0,0 +1,9 @@
+-- Lista de clientes distintos, sin bajar toda la tabla "sessions".
+-- Ejecutar una vez en el SQL editor de Supabase.
+
+create or replace function distinct_clients()
+returns table (client text)
+language sql stable
+as $$
+    select distinct s.client from sessions s order by s.client
+$$;
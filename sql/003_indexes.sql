@@ -0,0 +1,9 @@
+-- Índices para los filtros más usados por la app.
+-- Ejecutar una vez en el SQL editor de Supabase.
+
+-- fetch_sessions_between: ts >= X and ts < Y order by ts
+create index if not exists sessions_ts_idx on sessions (ts);
+
+-- get_monthly_payment / upsert on_conflict="client,year,month"
+create unique index if not exists monthly_payments_client_year_month_idx
+    on monthly_payments (client, year, month);
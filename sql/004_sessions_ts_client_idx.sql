@@ -0,0 +1,10 @@
+-- Rango mensual por ts que además trae client desde el índice.
+-- Reemplaza a sessions_ts_idx (ts), que queda cubierto por el prefijo.
+-- Ejecutar una vez en el SQL editor de Supabase.
+
+create index if not exists sessions_ts_client_idx on sessions (ts, client);
+drop index if exists sessions_ts_idx;
+
+-- Estadísticas frescas para que el planner elija los índices nuevos
+analyze sessions;
+analyze monthly_payments;
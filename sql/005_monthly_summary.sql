@@ -0,0 +1,16 @@
+-- Resumen por persona de un mes: clases, monto y estado de pago en una sola vista.
+-- Ejecutar una vez en el SQL editor de Supabase (después de 001_sessions_agg.sql).
+
+create or replace view monthly_summary
+with (security_invoker = true) as
+select
+    a.client,
+    a.year,
+    a.month,
+    a.clases,
+    a.monto,
+    coalesce(p.paid, false) as paid,
+    p.paid_on
+from sessions_agg a
+left join monthly_payments p
+    on p.client = a.client and p.year = a.year and p.month = a.month;
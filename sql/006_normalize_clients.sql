@@ -0,0 +1,42 @@
+-- Normaliza una sola vez los nombres de cliente heredados, para que la app
+-- pueda leer "client" tal cual (la normalización se hace al escribir).
+-- Equivale a normalize_client() de utils.py: colapsa cualquier espacio en
+-- blanco (tabs, saltos de línea) a uno solo, recorta los extremos y pone
+-- mayúscula inicial. Primero se colapsa y luego se recorta, porque btrim()
+-- solo quita espacios. Única diferencia: letras tras dígitos
+-- ("3rd" -> Python "3Rd", initcap "3rd").
+-- Ejecutar una vez en el SQL editor de Supabase. Se puede volver a ejecutar
+-- sin riesgo; con 007 ya aplicado, el trigger mueve también monthly_totals.
+
+create or replace function normalize_client(raw text)
+returns text
+language sql immutable
+as $$
+    select initcap(btrim(regexp_replace(raw, '\s+', ' ', 'g')))
+$$;
+
+begin;
+
+update sessions
+set client = normalize_client(client)
+where client is distinct from normalize_client(client);
+
+-- Si dos variantes del mismo nombre tienen pago en el mismo mes, se conserva
+-- la marcada como pagada (y la fecha de pago más reciente)
+with ranked as (
+    select ctid,
+           row_number() over (
+               partition by normalize_client(client), year, month
+               order by paid desc, paid_on desc nulls last
+           ) as rn
+    from monthly_payments
+)
+delete from monthly_payments mp
+using ranked r
+where mp.ctid = r.ctid and r.rn > 1;
+
+update monthly_payments
+set client = normalize_client(client)
+where client is distinct from normalize_client(client);
+
+commit;
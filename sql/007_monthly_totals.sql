@@ -0,0 +1,118 @@
+-- Totales por cliente y mes precalculados en una tabla que mantienen triggers
+-- sobre "sessions". El historial y el resumen leen filas ya agregadas en vez
+-- de agrupar toda la tabla en cada consulta.
+-- Ejecutar una vez en el SQL editor de Supabase (después de 001-006).
+
+begin;
+
+create table if not exists monthly_totals (
+    client text    not null,
+    year   int     not null,
+    month  int     not null,
+    clases int     not null default 0,
+    monto  numeric not null default 0,
+    primary key (client, year, month)
+);
+
+alter table monthly_totals enable row level security;
+
+drop policy if exists "monthly_totals_select_allowed" on monthly_totals;
+create policy "monthly_totals_select_allowed" on monthly_totals
+    for select to authenticated
+    using (is_allowed(lower(auth.jwt() ->> 'email')));
+
+-- Solo el trigger escribe en monthly_totals (security definer)
+create or replace function sessions_monthly_totals_sync()
+returns trigger
+language plpgsql
+security definer
+set search_path = public
+as $$
+begin
+    if tg_op in ('DELETE', 'UPDATE') then
+        update monthly_totals
+        set clases = clases - 1,
+            monto  = monto - coalesce(old.amount, 0)::numeric
+        where client = old.client
+          and year   = extract(year from old.ts)::int
+          and month  = extract(month from old.ts)::int;
+
+        delete from monthly_totals
+        where client = old.client
+          and year   = extract(year from old.ts)::int
+          and month  = extract(month from old.ts)::int
+          and clases <= 0;
+    end if;
+
+    if tg_op in ('INSERT', 'UPDATE') then
+        insert into monthly_totals (client, year, month, clases, monto)
+        values (new.client,
+                extract(year from new.ts)::int,
+                extract(month from new.ts)::int,
+                1,
+                coalesce(new.amount, 0)::numeric)
+        on conflict (client, year, month) do update
+        set clases = monthly_totals.clases + 1,
+            monto  = monthly_totals.monto + excluded.monto;
+    end if;
+
+    return null;
+end;
+$$;
+
+-- Recalcula monthly_totals desde cero a partir de "sessions". Cualquier
+-- migración posterior que cambie "sessions" (tipos de client, ts o amount)
+-- debe, en una transacción que bloquee la tabla: borrar el trigger, aplicar
+-- el cambio, volver a crear el trigger y ejecutar select rebuild_monthly_totals();
+create or replace function rebuild_monthly_totals()
+returns void
+language sql
+security definer
+set search_path = public
+as $$
+    delete from monthly_totals;
+    insert into monthly_totals (client, year, month, clases, monto)
+    select client,
+           extract(year from ts)::int,
+           extract(month from ts)::int,
+           count(*),
+           coalesce(sum(amount), 0)::numeric
+    from sessions
+    group by 1, 2, 3;
+$$;
+
+revoke execute on function rebuild_monthly_totals() from public, anon, authenticated;
+
+-- Bloquea escrituras mientras se recalcula, para no perder filas entre el
+-- backfill y la creación del trigger
+lock table sessions in share row exclusive mode;
+
+select rebuild_monthly_totals();
+
+-- Sin lista de columnas ("update of ..."): esa lista ata el trigger a las
+-- columnas e impide cambiarles el tipo. Un update que no las toca resta y
+-- vuelve a sumar la misma fila, así que el total no cambia.
+drop trigger if exists sessions_monthly_totals on sessions;
+create trigger sessions_monthly_totals
+    after insert or update or delete on sessions
+    for each row execute function sessions_monthly_totals_sync();
+
+-- El resumen mensual pasa a leer de la tabla; la vista sessions_agg ya no se usa
+drop view if exists monthly_summary;
+create view monthly_summary
+with (security_invoker = true) as
+select
+    t.client,
+    t.year,
+    t.month,
+    t.clases,
+    t.monto,
+    coalesce(p.paid, false) as paid,
+    p.paid_on
+from monthly_totals t
+left join monthly_payments p
+    on p.client = t.client and p.year = t.year and p.month = t.month;
+
+drop view if exists sessions_agg;
+
+commit;
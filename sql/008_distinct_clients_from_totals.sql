@@ -0,0 +1,10 @@
+-- distinct_clients() lee de monthly_totals (una fila por cliente y mes)
+-- en vez de recorrer toda la tabla "sessions".
+-- Ejecutar una vez en el SQL editor de Supabase (después de 007_monthly_totals.sql).
+
+create or replace function distinct_clients()
+returns table (client text)
+language sql stable
+as $$
+    select distinct t.client from monthly_totals t order by t.client
+$$;
@@ -0,0 +1,11 @@
+-- Índice cubriente para las consultas de pagos por mes (resumen mensual):
+-- year/month como clave y el resto de columnas leídas en INCLUDE, para que
+-- Postgres pueda responder con un index-only scan sin tocar la tabla.
+-- Las búsquedas por cliente ya las cubre el prefijo del índice único
+-- monthly_payments (client, year, month) de 003_indexes.sql.
+-- Ejecutar una vez en el SQL editor de Supabase.
+
+create index if not exists monthly_payments_year_month_idx
+    on monthly_payments (year, month) include (client, paid, paid_on);
+
+analyze monthly_payments;
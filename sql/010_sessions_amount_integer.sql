@@ -0,0 +1,26 @@
+-- Los valores se cobran en pesos colombianos sin centavos: "amount" pasa de
+-- punto flotante a pesos enteros (bigint), así las sumas son exactas.
+-- Ejecutar una vez en el SQL editor de Supabase (después de 007_monthly_totals.sql,
+-- que elimina la vista sessions_agg que dependía de esta columna y define
+-- rebuild_monthly_totals(); si no existe, volver a ejecutar 007 antes).
+--
+-- El trigger de monthly_totals bloquea el cambio de tipo, así que se borra y se
+-- vuelve a crear. monthly_totals.monto guarda las sumas en flotante, por eso se
+-- recalcula al final con los montos ya redondeados.
+
+begin;
+
+lock table sessions in share row exclusive mode;
+
+drop trigger if exists sessions_monthly_totals on sessions;
+
+alter table sessions
+    alter column amount type bigint using round(amount)::bigint;
+
+create trigger sessions_monthly_totals
+    after insert or update or delete on sessions
+    for each row execute function sessions_monthly_totals_sync();
+
+select rebuild_monthly_totals();
+
+commit;
@@ -0,0 +1,48 @@
+# utils.py — constantes y utilidades de formato/normalización
+
+import calendar
+from datetime import datetime
+
+import pandas as pd
+
+MESES_ES = [
+    "Enero","Febrero","Marzo","Abril","Mayo","Junio",
+    "Julio","Agosto","Septiembre","Octubre","Noviembre","Diciembre"
+]
+MES_A_NUM = {name: i+1 for i, name in enumerate(MESES_ES)}
+_MESES_ARR = pd.Series(MESES_ES).to_numpy()  # para indexar meses en bloque
+CALENDARIO = calendar.Calendar(firstweekday=calendar.MONDAY)  # semanas de lunes a domingo
+
+def month_label_es(y: int, m: int) -> str:
+    return f"{MESES_ES[m-1]} {y}"
+
+def month_label_es_series(years: pd.Series, months: pd.Series) -> pd.Series:
+    """Versión vectorizada de month_label_es para columnas de año y mes."""
+    nombres = _MESES_ARR.take(months.to_numpy().astype(int) - 1)
+    return pd.Series(nombres, index=months.index) + " " + years.astype(int).astype(str)
+
+def month_range(year: int, month: int):
+    start_dt = datetime(year, month, 1, 0, 0, 0)
+    end_dt = datetime(year + (1 if month == 12 else 0), (1 if month == 12 else month + 1), 1, 0, 0, 0)
+    return start_dt, end_dt
+
+def to_db_ts(dt: datetime) -> str:
+    """Formato de ts que guarda la tabla sessions ('YYYY-MM-DD HH:MM:SS')."""
+    return dt.isoformat(sep=" ", timespec="seconds")
+
+def fmt_money(x: float) -> str:
+    try:
+        return f"${x:,.0f}".replace(",", ".")  # estilo COP $30.000
+    except Exception:
+        return str(x)
+
+def fmt_money_series(s: pd.Series) -> pd.Series:
+    """Versión vectorizada de fmt_money para una columna completa."""
+    enteros = s.fillna(0).round().astype("int64")
+    return "$" + enteros.map("{:,}".format).str.replace(",", ".", regex=False)
+
+def normalize_client(raw: str) -> str:
+    if not raw:
+        return ""
+    s = " ".join(raw.split())
+    return s.title()